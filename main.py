@@ -1,28 +1,51 @@
 import streamlit as st
 from pytrends.request import TrendReq
+from pytrends.exceptions import TooManyRequestsError
 from openai import OpenAI  # Updated import
+import pandas as pd
+import hashlib
 import os
+import random
+import threading
+import time
+
+# Google Trends data changes slowly; keep related queries for a day
+TRENDS_TTL = 24 * 60 * 60
+# Cap on cached trends entries; keys come from free-form keywords
+TRENDS_MAX_ENTRIES = 500
+# Google Trends accepts at most five keywords per payload
+MAX_PAYLOAD_KEYWORDS = 5
+# Attempts at a Google Trends payload before a 429 is surfaced to the user
+TRENDS_ATTEMPTS = 4
+# Upper bound (seconds) on a single backoff sleep
+TRENDS_MAX_BACKOFF = 30
+# Minimum spacing (seconds) between real Google Trends requests
+TRENDS_MIN_GAP = 1.0
+# Generated meta descriptions are reused for identical requests for a day
+META_TTL = 24 * 60 * 60
+# Cap on cached descriptions; keys come from free-form topics
+META_MAX_ENTRIES = 500
 
 # ========================
 # 🛠️ CONFIGURATION
 # ========================
-def configure_openai():
-    """Initialize OpenAI client with multiple fallback options"""
+def get_openai_key() -> str:
+    """Resolve the OpenAI API key with multiple fallback options"""
     try:
         # Try Streamlit secrets first
         if "OPENAI_API_KEY" in st.secrets:
-            return OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+            return st.secrets["OPENAI_API_KEY"]
         
         # Fallback to environment variable
         if os.getenv("OPENAI_API_KEY"):
-            return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            return os.getenv("OPENAI_API_KEY")
         
         # Final fallback to user input
         with st.sidebar:
             st.warning("API key not found in secrets")
             temp_key = st.text_input("Enter OpenAI API Key:", type="password")
             if temp_key:
-                return OpenAI(api_key=temp_key)
+                return temp_key
         
         st.error("API key required to continue")
         st.stop()
@@ -30,6 +53,14 @@ def configure_openai():
         st.error(f"API configuration failed: {str(e)}")
         st.stop()
 
+def get_client() -> OpenAI:
+    """Return this session's OpenAI client, rebuilding it when the key changes"""
+    api_key = get_openai_key()
+    cached = st.session_state.get("openai_client")
+    if cached is None or cached[0] != api_key:
+        cached = st.session_state.openai_client = (api_key, OpenAI(api_key=api_key))
+    return cached[1]
+
 # ========================
 # 🖥️ PAGE SETUP
 # ========================
@@ -42,29 +73,163 @@ st.set_page_config(
 st.title("🔍 AI SEO Specialist")
 st.caption("Boost your SEO with AI-driven keyword research and content generation!")
 
-# Initialize OpenAI client
-client = configure_openai()
-
 # ========================
 # 🛠️ TOOL FUNCTIONS
 # ========================
-def fetch_keyword_trends(keyword: str):
-    """Fetch related queries from Google Trends"""
-    try:
-        with st.spinner("🔍 Analyzing search trends..."):
-            pytrends = TrendReq(hl='en-US', tz=330)
-            pytrends.build_payload([keyword])
-            trends = pytrends.related_queries()
-            return trends[keyword]['top']
-    except Exception as e:
-        st.error(f"Trends API error: {str(e)}")
-        return None
+@st.cache_resource
+def get_pytrends():
+    """Build one shared Google Trends session.
+
+    TrendReq isn't thread-safe, so it comes with a lock that must be held
+    around build_payload/related_queries. Retries stay off: pytrends builds
+    its urllib3 Retry with ``method_whitelist``, which urllib3 2 rejects.
+    """
+    pytrends = TrendReq(hl='en-US', tz=330, timeout=(10, 25))
+    return pytrends, threading.Lock()
+
+@st.cache_resource
+def _trends_last_call():
+    """Monotonic time of the last Google Trends request, shared across reruns"""
+    return [0.0]
+
+def _fetch_related_queries(keywords: tuple[str, ...]) -> dict[str, tuple[float, pd.DataFrame]]:
+    """Fetch top related queries for one payload as ``{keyword: (fetched_at, frame)}``.
+
+    Backs off exponentially (with jitter) on 429s. The TrendReq lock is
+    held per attempt only, so backoff sleeps don't stall other sessions;
+    build_payload is repeated each attempt because related_queries reads
+    the state it sets.
+    """
+    pytrends, lock = get_pytrends()
+    for attempt in range(TRENDS_ATTEMPTS):
+        try:
+            with lock:
+                last_call = _trends_last_call()
+                gap = TRENDS_MIN_GAP - (time.monotonic() - last_call[0])
+                if gap > 0:
+                    time.sleep(gap)
+                last_call[0] = time.monotonic()
+                pytrends.build_payload(list(keywords))
+                related = pytrends.related_queries()
+            break
+        except TooManyRequestsError as e:
+            if attempt == TRENDS_ATTEMPTS - 1:
+                raise
+            retry_after = e.response.headers.get('Retry-After', '') if e.response is not None else ''
+            if retry_after.isdigit():
+                time.sleep(min(int(retry_after), TRENDS_MAX_BACKOFF))
+            else:
+                time.sleep(2 ** attempt + random.random())
+
+    fetched_at = time.time()
+    entries = {}
+    for keyword in keywords:
+        top = related.get(keyword, {}).get('top')
+        if top is None or top.empty:
+            top = pd.DataFrame()
+        else:
+            top = top.assign(
+                # Interest is 0-100, so this lands on int8 instead of int64
+                value=pd.to_numeric(top['value'], downcast='integer'),
+                source_keyword=keyword
+            )
+        entries[keyword] = (fetched_at, top)
+    return entries
+
+class _TrendsMiss(Exception):
+    """Raised by the trends caches on a miss; exceptions are never cached"""
+
+@st.cache_data(persist="disk", max_entries=TRENDS_MAX_ENTRIES, show_spinner=False)
+def _cached_related_queries(keyword: str, _fetched=None):
+    """Disk-persisted ``(fetched_at, frame)`` per keyword.
+
+    Persisted caches ignore ``ttl``, so callers compare ``fetched_at``
+    instead. Misses raise ``_TrendsMiss`` so the caller can batch them into
+    one payload; ``_fetched`` (kept out of the cache key by its underscore)
+    then seeds the entry.
+    """
+    if _fetched is None:
+        raise _TrendsMiss(keyword)
+    return _fetched
+
+@st.cache_resource(max_entries=TRENDS_MAX_ENTRIES, show_spinner=False)
+def _trends_singleton(keyword: str, _fetched=None):
+    """Share one ``(fetched_at, frame)`` pair per keyword across reruns.
+
+    Unlike ``st.cache_data`` this hands back the same object on every hit
+    instead of a deep copy, so callers must treat it as read-only.
+    """
+    return _cached_related_queries(keyword, _fetched)
+
+def fetch_keyword_trends(keywords: tuple[str, ...]) -> pd.DataFrame:
+    """Fetch related queries from Google Trends, batching uncached keywords five per payload"""
+    keywords = tuple(dict.fromkeys(k.strip().lower() for k in keywords if k.strip()))
+    results = {}
+    to_fetch = []
+    with st.spinner("🔍 Analyzing search trends..."):
+        for keyword in keywords:
+            try:
+                fetched_at, trends = _trends_singleton(keyword)
+            except _TrendsMiss:
+                to_fetch.append(keyword)
+                continue
+            results[keyword] = trends
+            # Checked on every hit: neither cache layer knows the data's age.
+            # Stale frames stay in results so a failed refresh keeps them.
+            if time.time() - fetched_at > TRENDS_TTL:
+                to_fetch.append(keyword)
+
+        for i in range(0, len(to_fetch), MAX_PAYLOAD_KEYWORDS):
+            payload = tuple(to_fetch[i:i + MAX_PAYLOAD_KEYWORDS])
+            try:
+                fetched = _fetch_related_queries(payload)
+            except Exception as e:
+                if all(keyword in results for keyword in payload):
+                    st.warning(f"Showing older trends data; refresh failed: {str(e)}")
+                else:
+                    st.error(f"Trends API error: {str(e)}")
+                continue
+            for keyword, entry in fetched.items():
+                _trends_singleton.clear(keyword)
+                _cached_related_queries.clear(keyword)
+                results[keyword] = _trends_singleton(keyword, entry)[1]
+
+    # Keep the order the user typed the keywords in
+    frames = [results[k] for k in keywords if k in results and not results[k].empty]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+@st.cache_resource
+def _meta_description_cache():
+    """Generated descriptions keyed on (API key hash, topic, tone), shared by all sessions.
+
+    A plain dict of ``(created_at, text)`` rather than ``st.cache_data`` so
+    cache misses can still stream tokens to the page while they're
+    generated. Insertion order doubles as age order for eviction.
+    """
+    entries: dict[tuple[str, str, str], tuple[float, str]] = {}
+    return entries, threading.Lock()
+
+def generate_meta_description(client: OpenAI, topic: str, tone: str, regenerate: bool = False) -> str:
+    """Generate SEO meta description using AI, rendering tokens as they arrive.
+
+    Repeat requests on the same API key reuse the last description unless
+    ``regenerate`` is set, which skips the lookup and replaces the entry.
+    """
+    cache, lock = _meta_description_cache()
+    # Scoped per key so nobody is served text billed to someone else's key
+    key_id = hashlib.sha256(client.api_key.encode()).hexdigest()
+    key = (key_id, " ".join(topic.lower().split()), tone)
+    if not regenerate:
+        with lock:
+            cached = cache.get(key)
+        if cached is not None and time.time() - cached[0] <= META_TTL:
+            return cached[1]
 
-def generate_meta_description(topic: str, tone: str) -> str:
-    """Generate SEO meta description using AI"""
     try:
         with st.spinner("✨ Crafting perfect meta description..."):
-            response = client.chat.completions.create(
+            stream = client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -77,9 +242,22 @@ def generate_meta_description(topic: str, tone: str) -> str:
                     }
                 ],
                 max_tokens=60,
-                temperature=0.7
+                temperature=0.7,
+                stream=True
             )
-            return response.choices[0].message.content.strip()
+        description = st.write_stream(
+            chunk.choices[0].delta.content or ""
+            for chunk in stream
+            if chunk.choices
+        )
+        description = description.strip()
+        if description:
+            with lock:
+                cache.pop(key, None)
+                while len(cache) >= META_MAX_ENTRIES:
+                    del cache[next(iter(cache))]
+                cache[key] = (time.time(), description)
+        return description
     except Exception as e:
         st.error(f"Generation failed: {str(e)}")
         return None
@@ -95,30 +273,39 @@ with st.sidebar:
 if menu == "Keyword Explorer":
     st.header("🔎 Keyword Explorer")
     keyword = st.text_input(
-        "Enter a niche or seed keyword:",
-        placeholder="e.g., 'digital marketing'",
+        "Enter a niche or seed keyword (comma-separate several):",
+        placeholder="e.g., 'digital marketing, content strategy'",
         key="keyword_input"
     )
     
     if st.button("Fetch Trends", type="primary"):
-        if not keyword:
+        keywords = tuple(k.strip() for k in keyword.split(',') if k.strip())
+        if not keywords:
             st.warning("Please enter a keyword")
         else:
-            trends_data = fetch_keyword_trends(keyword)
-            if trends_data is not None:
-                if not trends_data.empty:
-                    st.subheader("🔥 Top Related Queries")
-                    st.dataframe(
-                        trends_data,
-                        use_container_width=True,
-                        hide_index=True
-                    )
-                else:
-                    st.info("No trending queries found. Try a different keyword.")
+            trends_data = fetch_keyword_trends(keywords)
+            if not trends_data.empty:
+                st.subheader("🔥 Top Related Queries")
+                st.dataframe(
+                    trends_data,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "query": st.column_config.TextColumn("Query"),
+                        "value": st.column_config.NumberColumn(
+                            "Interest", format="%d", help="Relative search interest (0-100)"
+                        ),
+                        "source_keyword": st.column_config.TextColumn("Seed Keyword"),
+                    }
+                )
+            else:
+                st.info("No trending queries found. Try a different keyword.")
 
 # ✍️ Content Generator Tool
 elif menu == "Content Generator":
     st.header("✍️ Content Generator")
+    # Only this tool needs the LLM; prompts for a key here if none is configured
+    client = get_client()
     col1, col2 = st.columns([3, 1])
     
     with col1:
@@ -135,12 +322,20 @@ elif menu == "Content Generator":
             key="tone_select"
         )
     
-    if st.button("Generate Meta Description", type="primary"):
+    col3, col4 = st.columns([3, 1])
+    with col3:
+        generate = st.button("Generate Meta Description", type="primary")
+    with col4:
+        regenerate = st.button("Regenerate", help="Skip the saved description and write a new one")
+    
+    if generate or regenerate:
         if not topic:
             st.warning("Please enter a topic")
         else:
-            description = generate_meta_description(topic, tone)
+            st.subheader("📝 Generated Meta Description")
+            output = st.empty()
+            with output:
+                description = generate_meta_description(client, topic, tone, regenerate)
             if description:
-                st.subheader("📝 Generated Meta Description")
-                st.success(description)
+                output.success(description)
                 st.caption(f"Character count: {len(description)}/160")